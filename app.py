@@ -1,50 +1,127 @@
 # app.py -- Bech De (final, Postgres + SQLite compatible)
 from flask import (
     Flask, render_template, request, redirect,
-    url_for, session, jsonify
+    url_for, session, jsonify, stream_template, abort
 )
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from werkzeug.security import check_password_hash
 import os
 import csv
-from functools import wraps
+import json
+import hashlib
+import hmac
+import base64
+from functools import wraps, lru_cache
+from contextlib import contextmanager
+import queue
+import threading
+import time
+import atexit
 
 # DB config
 DATABASE_URL = os.environ.get("DATABASE_URL")  # Render will set this when you add a Postgres DB
 SQLITE_PATH = "bechde.db"
 CODES_CSV = "codes.csv"
+DB_POOL_MIN = 2
+DB_POOL_MAX = 10
+# PBKDF2-SHA256 rounds for hash_password()/verify_password(); each login costs
+# ~40 ms of CPU at this setting, so raise it only with the login latency in mind
+PASSWORD_HASH_ITERATIONS = 120000
+LEADERBOARD_PAGE_SIZE = 100
+LEADERBOARD_MAX_PAGE = 10000  # keeps OFFSET well inside what SQLite/Postgres can bind
+LEADERBOARD_CACHE_TTL = 2  # seconds a leaderboard page is served from memory
+LEADERBOARD_CACHE_PAGES = 16  # only pages 1..N are cached, which bounds the cache size
+SCAN_LOG_BATCH = 5000   # max scans rows written per flush
+SCAN_LOG_COPY_MIN = 500 # Postgres: batches bigger than this go through COPY instead of executemany
+SCAN_LOG_WAIT = 0.05    # seconds to wait for more rows before flushing a batch
 
 # Flask app
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-change-this")
+# static files (logo etc.) don't change during an event; let browsers keep them
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 3600
 
 # detect mode
 USE_PG = bool(DATABASE_URL)
 
 # Lazy imports for DB drivers
 if USE_PG:
-    import psycopg
     from psycopg import errors as pg_errors
+    from psycopg_pool import ConnectionPool
+    DB_ERROR = pg_errors.Error  # base of every psycopg error (incl. pool timeouts)
 else:
     import sqlite3
+    DB_ERROR = sqlite3.Error
+    # UPDATE ... RETURNING needs SQLite 3.35+
+    SQLITE_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# --------------------------
+# Connection pool (Postgres only; one per process, shared by all requests)
+# --------------------------
+# SQLite isn't pooled: a local connect is cheap, and a fresh connection per
+# checkout is the only way every worker process sees /admin/reset's new DB file.
+# pid that owns the pool; connections must not be shared across fork
+# (gunicorn --preload imports the app in the master), so a forked worker builds its own
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+if USE_PG:
+    POOL = None
+
+    def _get_pg_pool():
+        global POOL, _pool_pid
+        if _pool_pid != os.getpid():
+            with _pool_lock:
+                if _pool_pid != os.getpid():
+                    # the inherited pool's sockets belong to the parent; just leave them alone
+                    POOL = ConnectionPool(
+                        DATABASE_URL,
+                        min_size=DB_POOL_MIN,
+                        max_size=DB_POOL_MAX,
+                        # prepare statements server-side from their second execution (psycopg's
+                        # default is the 6th), so the hot /api/scan and login queries skip parse + plan
+                        kwargs={"autocommit": False, "prepare_threshold": 1},
+                        # ping connections on checkout so ones dropped by a server restart
+                        # or idle timeout are replaced instead of failing a request
+                        check=ConnectionPool.check_connection,
+                        open=True,
+                    )
+                    _pool_pid = os.getpid()
+        return POOL
+
+def _new_sqlite_conn():
+    conn = sqlite3.connect(SQLITE_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    # WAL: readers don't block the writer and commits don't fsync every time
+    # (journal_mode is persistent in the file, the rest are per-connection)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    return conn
 
 # --------------------------
 # DB helper utilities
 # --------------------------
+@contextmanager
 def get_db_conn():
     """
-    Return a new DB connection.
-    - Postgres: psycopg connection
-    - SQLite: sqlite3 connection (row_factory set)
-    Caller must close() the connection (or use 'with' context).
+    Context manager yielding a DB connection for the duration of the block.
+    - Postgres: pooled psycopg connection (committed on success, rolled back on error)
+    - SQLite: new sqlite3 connection (row_factory set), closed on exit
+    Use it to run several statements on one connection:
+        with get_db_conn() as conn: ...
     """
     if USE_PG:
-        # psycopg.connect accepts the DATABASE_URL string
-        return psycopg.connect(DATABASE_URL, autocommit=False)
-    else:
-        conn = sqlite3.connect(SQLITE_PATH, check_same_thread=False)
-        conn.row_factory = sqlite3.Row
-        return conn
+        with _get_pg_pool().connection() as conn:
+            yield conn
+        return
+
+    conn = _new_sqlite_conn()
+    try:
+        yield conn
+    finally:
+        conn.close()
 
 def _pg_row_to_dict(row, cursor):
     if row is None:
@@ -57,50 +134,70 @@ def _sqlite_row_to_dict(row):
         return None
     return dict(row)
 
+@lru_cache(maxsize=256)
 def adapt_sql(sql):
     """
     Convert SQL that uses ? placeholders (sqlite style)
     into %s placeholders (postgres style) when needed.
+    Cached: the app only ever sends a handful of distinct query strings.
     """
     if USE_PG:
         return sql.replace("?", "%s")
     return sql
 
-def db_execute(sql, params=(), fetchone=False, fetchall=False, commit=False):
+def db_execute(sql, params=(), fetchone=False, fetchall=False, commit=False, conn=None):
     """
     Unified DB execute wrapper.
     - sql: use '?' placeholders for params (we convert to %s for Postgres)
     - params: tuple/list
     - fetchone/fetchall/commit as needed
+    - conn: reuse a connection from get_db_conn(); if None, one is checked out just for this call
     Returns fetched rows as dict(s) (or None).
     """
-    adapted = adapt_sql(sql)
-    conn = get_db_conn()
-    try:
-        if USE_PG:
-            with conn.cursor() as cur:
-                cur.execute(adapted, params)
-                if commit:
-                    conn.commit()
-                if fetchone:
-                    return _pg_row_to_dict(cur.fetchone(), cur)
-                if fetchall:
-                    rows = cur.fetchall()
-                    return [_pg_row_to_dict(r, cur) for r in rows]
-                return None
-        else:
-            cur = conn.cursor()
-            cur.execute(adapted, params)
+    if conn is None:
+        with get_db_conn() as conn:
+            return db_execute(sql, params, fetchone, fetchall, commit, conn)
+
+    if USE_PG:
+        with conn.cursor() as cur:
+            cur.execute(adapt_sql(sql), params)
             if commit:
                 conn.commit()
             if fetchone:
-                return _sqlite_row_to_dict(cur.fetchone())
+                return _pg_row_to_dict(cur.fetchone(), cur)
             if fetchall:
                 rows = cur.fetchall()
-                return [dict(r) for r in rows]
+                return [_pg_row_to_dict(r, cur) for r in rows]
             return None
-    finally:
-        conn.close()
+    else:
+        # SQLite already uses ? placeholders, no rewrite needed
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        if commit:
+            conn.commit()
+        if fetchone:
+            return _sqlite_row_to_dict(cur.fetchone())
+        if fetchall:
+            rows = cur.fetchall()
+            return [dict(r) for r in rows]
+        return None
+
+def db_iter(sql, params=()):
+    """
+    Generator version of db_execute(..., fetchall=True): yields rows as dicts
+    straight from the cursor instead of building a list. The connection is held
+    until the generator is exhausted or closed.
+    """
+    with get_db_conn() as conn:
+        if USE_PG:
+            # named cursor = server-side, rows arrive in chunks as we iterate
+            with conn.cursor(name="db_iter") as cur:
+                cur.execute(adapt_sql(sql), params)
+                for row in cur:
+                    yield _pg_row_to_dict(row, cur)
+        else:
+            for row in conn.execute(sql, params):
+                yield dict(row)
 
 # --------------------------
 # DB initialization & CSV load
@@ -131,6 +228,11 @@ def init_db():
         code_id INTEGER NOT NULL,
         scanned_at TEXT NOT NULL
     );
+
+    CREATE INDEX IF NOT EXISTS idx_scans_player_id ON scans (player_id);
+
+    -- matches the leaderboard ORDER BY, so a page is an index range scan
+    CREATE INDEX IF NOT EXISTS idx_players_score_name ON players (score DESC, name ASC);
     """
 
     # For SQLite we adjust SERIAL -> INTEGER AUTOINCREMENT
@@ -138,72 +240,242 @@ def init_db():
         "SERIAL PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT"
     )
 
-    if USE_PG:
-        # create tables in Postgres
-        conn = get_db_conn()
-        try:
+    with get_db_conn() as conn:
+        if USE_PG:
+            # create tables in Postgres
             with conn.cursor() as cur:
                 cur.execute(create_tables_sql_pg)
             conn.commit()
-        finally:
-            conn.close()
-    else:
-        conn = get_db_conn()
-        try:
+        else:
             cur = conn.cursor()
             cur.executescript(create_tables_sql_sqlite)
             conn.commit()
-        finally:
-            conn.close()
 
-    # Load codes from CSV only if table is empty
-    # Check count
-    try:
-        cnt_row = db_execute("SELECT COUNT(*) as c FROM codes", fetchone=True)
-        cnt = None
-        if cnt_row:
-            # depending on driver we may get dict with 'c' key or column name alias
-            # For Postgres psycopg, column name likely 'count' or 'c' depending; we used alias 'c' so check.
-            if isinstance(cnt_row, dict):
-                cnt = list(cnt_row.values())[0]
-            else:
-                cnt = cnt_row
-        if cnt is None:
+        # Load codes from CSV only if table is empty
+        # Check count
+        try:
+            cnt_row = db_execute("SELECT COUNT(*) as c FROM codes", fetchone=True, conn=conn)
+            cnt = None
+            if cnt_row:
+                # depending on driver we may get dict with 'c' key or column name alias
+                # For Postgres psycopg, column name likely 'count' or 'c' depending; we used alias 'c' so check.
+                if isinstance(cnt_row, dict):
+                    cnt = list(cnt_row.values())[0]
+                else:
+                    cnt = cnt_row
+            if cnt is None:
+                cnt = 0
+        except Exception:
+            conn.rollback()
             cnt = 0
-    except Exception:
-        cnt = 0
-
-    if cnt == 0 and os.path.exists(CODES_CSV):
-        # load codes
-        with open(CODES_CSV, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            codes = [row.get("code").strip() for row in reader if row.get("code") and row.get("code").strip()]
-        if codes:
-            # insert in batches
-            if USE_PG:
-                conn = get_db_conn()
-                try:
+
+        if cnt == 0 and os.path.exists(CODES_CSV):
+            # load codes
+            with open(CODES_CSV, newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                codes = [row.get("code").strip() for row in reader if row.get("code") and row.get("code").strip()]
+            # drop duplicates up front (keeps CSV order)
+            codes = list(dict.fromkeys(codes))
+            if codes:
+                # bulk load in a single transaction
+                if USE_PG:
                     with conn.cursor() as cur:
-                        for code in codes:
-                            # use ON CONFLICT DO NOTHING
-                            cur.execute("INSERT INTO codes (code) VALUES (%s) ON CONFLICT DO NOTHING;", (code,))
+                        # COPY streams every row into a scratch table in one statement; the
+                        # final INSERT skips codes that already exist, since other workers
+                        # may be running this same load at startup
+                        cur.execute(
+                            "CREATE TEMP TABLE codes_load (n INTEGER, code TEXT) ON COMMIT DROP"
+                        )
+                        with cur.copy("COPY codes_load (n, code) FROM STDIN") as copy:
+                            for n, code in enumerate(codes):
+                                copy.write_row((n, code))
+                        cur.execute(
+                            "INSERT INTO codes (code) SELECT code FROM codes_load ORDER BY n "
+                            "ON CONFLICT DO NOTHING"
+                        )
                     conn.commit()
-                finally:
-                    conn.close()
+                else:
+                    # one statement: the whole list goes in as a single JSON array parameter
+                    with conn:
+                        conn.execute(
+                            "INSERT OR IGNORE INTO codes (code) SELECT value FROM json_each(?)",
+                            (json.dumps(codes),)
+                        )
+            print("Loaded codes from CSV.")
+
+def _sqlite_claim_code(conn, player_id, code, now):
+    """
+    Mark `code` as used by `player_id` if nobody has claimed it yet.
+    Returns the code id, or None if the code is unknown or already used.
+    """
+    if SQLITE_HAS_RETURNING:
+        row = conn.execute(
+            "UPDATE codes SET used_by_player_id = ?, used_at = ? "
+            "WHERE code = ? AND used_by_player_id IS NULL RETURNING id",
+            (player_id, now, code)
+        ).fetchone()
+        return row["id"] if row else None
+
+    # SQLite < 3.35: no RETURNING, so check the row count and look the id up
+    cur = conn.execute(
+        "UPDATE codes SET used_by_player_id = ?, used_at = ? "
+        "WHERE code = ? AND used_by_player_id IS NULL",
+        (player_id, now, code)
+    )
+    if cur.rowcount == 0:
+        return None
+    return conn.execute("SELECT id FROM codes WHERE code = ?", (code,)).fetchone()["id"]
+
+def _sqlite_bump_score(conn, player_id):
+    """Add one point to the player and return the new score."""
+    if SQLITE_HAS_RETURNING:
+        row = conn.execute(
+            "UPDATE players SET score = score + 1 WHERE id = ? RETURNING score", (player_id,)
+        ).fetchone()
+    else:
+        conn.execute("UPDATE players SET score = score + 1 WHERE id = ?", (player_id,))
+        row = conn.execute("SELECT score FROM players WHERE id = ?", (player_id,)).fetchone()
+    return row["score"] if row else 0
+
+# --------------------------
+# Scan audit log (write-behind)
+# --------------------------
+# The scans table is only an audit trail, so /api/scan just queues the row and a
+# background thread inserts queued rows in batches. Rows still queued when the
+# process is killed are lost (normal shutdown flushes them via atexit).
+# A row is only written while its code is still claimed by that player at that
+# time, so rows queued before an /admin/reset (in any process) are dropped rather
+# than attached to the new players/codes that reuse the same ids.
+SCAN_LOG_Q = queue.Queue()
+# pid of the process whose writer thread is running; threads don't survive fork
+# (gunicorn --preload), so each process starts its own on its first scan
+_scan_log_pid = None
+_scan_log_lock = threading.Lock()
+
+# params: (player_id, code_id, scanned_at); inserts nothing if the claim is gone
+SCAN_LOG_INSERT_SQL = (
+    "INSERT INTO scans (player_id, code_id, scanned_at) "
+    "SELECT used_by_player_id, id, used_at FROM codes "
+    "WHERE used_by_player_id = ? AND id = ? AND used_at = ?"
+)
+
+def _flush_scan_log(batch):
+    try:
+        with get_db_conn() as conn:
+            if USE_PG:
+                with conn.cursor() as cur:
+                    if len(batch) > SCAN_LOG_COPY_MIN:
+                        # big backlog: stream it in one COPY, then keep the rows still valid
+                        cur.execute(
+                            "CREATE TEMP TABLE scans_load (player_id INTEGER, code_id INTEGER, "
+                            "scanned_at TEXT) ON COMMIT DROP"
+                        )
+                        with cur.copy("COPY scans_load (player_id, code_id, scanned_at) FROM STDIN") as copy:
+                            for row in batch:
+                                copy.write_row(row)
+                        cur.execute(
+                            "INSERT INTO scans (player_id, code_id, scanned_at) "
+                            "SELECT l.player_id, l.code_id, l.scanned_at FROM scans_load l "
+                            "JOIN codes c ON c.id = l.code_id "
+                            "AND c.used_by_player_id = l.player_id AND c.used_at = l.scanned_at"
+                        )
+                    else:
+                        # psycopg pipelines executemany, so this is still one round-trip
+                        cur.executemany(adapt_sql(SCAN_LOG_INSERT_SQL), batch)
             else:
-                conn = get_db_conn()
-                try:
-                    cur = conn.cursor()
-                    for code in codes:
-                        cur.execute("INSERT OR IGNORE INTO codes (code) VALUES (?)", (code,))
-                    conn.commit()
-                finally:
-                    conn.close()
-        print("Loaded codes from CSV.")
+                conn.executemany(SCAN_LOG_INSERT_SQL, batch)
+            conn.commit()
+    except Exception as e:
+        print(f"Could not write {len(batch)} scan log row(s): {e}")
+
+def _scan_log_writer():
+    while True:
+        batch = [SCAN_LOG_Q.get()]
+        deadline = time.monotonic() + SCAN_LOG_WAIT
+        while len(batch) < SCAN_LOG_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(SCAN_LOG_Q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _flush_scan_log(batch)
+
+def log_scan(player_id, code_id, scanned_at):
+    """Queue a scans row for the background writer, starting it in this process if needed."""
+    global _scan_log_pid
+    if _scan_log_pid != os.getpid():
+        with _scan_log_lock:
+            if _scan_log_pid != os.getpid():
+                threading.Thread(target=_scan_log_writer, name="scan-log-writer", daemon=True).start()
+                _scan_log_pid = os.getpid()
+    SCAN_LOG_Q.put((player_id, code_id, scanned_at))
+
+def _take_scan_log():
+    batch = []
+    while True:
+        try:
+            batch.append(SCAN_LOG_Q.get_nowait())
+        except queue.Empty:
+            return batch
+
+@atexit.register
+def _drain_scan_log():
+    batch = _take_scan_log()
+    if batch:
+        _flush_scan_log(batch)
 
 # --------------------------
-# Helper decorator
+# Helpers
 # --------------------------
+def hash_password(password):
+    """Hash as "pbkdf2_sha256$<iterations>$<salt_b64>$<hash_b64>"."""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PASSWORD_HASH_ITERATIONS)
+    return "pbkdf2_sha256${}${}${}".format(
+        PASSWORD_HASH_ITERATIONS,
+        base64.b64encode(salt).decode(),
+        base64.b64encode(digest).decode(),
+    )
+
+def verify_password(stored, password):
+    """
+    Check a password against a hash_password() hash with a direct hashlib call.
+    Hashes made by werkzeug (accounts registered before the switch) go through
+    check_password_hash instead. A malformed hash never matches.
+    """
+    if is_legacy_password_hash(stored):
+        return check_password_hash(stored, password)
+    try:
+        _, iterations, salt, digest = stored.split("$", 3)
+        candidate = hashlib.pbkdf2_hmac("sha256", password.encode(), base64.b64decode(salt), int(iterations))
+        return hmac.compare_digest(candidate, base64.b64decode(digest))
+    except ValueError:
+        return False
+
+def is_legacy_password_hash(stored):
+    """True for werkzeug-format hashes, which login upgrades to hash_password()."""
+    return not stored.startswith("pbkdf2_sha256$")
+
+# page -> (expires_at, players); per process, cleared whenever a scan changes a score
+_leaderboard_cache = {}
+
+_iso_second = (None, "")  # (unix second, "YYYY-MM-DDTHH:MM:SS") of the last call
+
+def utc_now_iso():
+    """
+    Current UTC time as an ISO string (same format as datetime.utcnow().isoformat()).
+    The date/time part is only formatted once per second; /api/scan calls this on every scan.
+    """
+    global _iso_second
+    sec, micros = divmod(time.time_ns() // 1000, 1_000_000)
+    cached_sec, prefix = _iso_second
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _iso_second = (sec, prefix)
+    return f"{prefix}.{micros:06d}"
+
 def login_required(view):
     @wraps(view)
     def wrapped(*args, **kwargs):
@@ -229,7 +501,7 @@ def register():
         if not name or not password:
             return render_template("register.html", error="Name and password required")
 
-        pw_hash = generate_password_hash(password)
+        pw_hash = hash_password(password)
         try:
             # Insert new player
             if USE_PG:
@@ -275,7 +547,14 @@ def login():
             fetchone=True
         )
 
-        if player and check_password_hash(player.get("password_hash"), password):
+        if player and verify_password(player.get("password_hash"), password):
+            if is_legacy_password_hash(player.get("password_hash")):
+                # move old werkzeug (scrypt) hashes to the cheaper format now that we know the password
+                db_execute(
+                    "UPDATE players SET password_hash = ? WHERE id = ?",
+                    (hash_password(password), player.get("id")),
+                    commit=True
+                )
             session["player_id"] = player.get("id")
             session["player_name"] = player.get("name")
             return redirect(url_for("scan"))
@@ -303,59 +582,91 @@ def api_scan():
         return jsonify({"status": "error", "message": "No code detected"})
 
     player_id = session["player_id"]
-    now = datetime.utcnow().isoformat()
+    now = utc_now_iso()
 
-    # 1) find code
-    code_row = db_execute("SELECT * FROM codes WHERE code = ?", (scanned_code,), fetchone=True)
-    if not code_row:
-        return jsonify({"status": "invalid", "message": "Invalid code"})
-
-    # Depending on DB wrapper, used_by_player_id may be None or null
-    used_by = code_row.get("used_by_player_id")
-    if used_by:
-        return jsonify({"status": "used", "message": "⛔ Already claimed!"})
-
-    # 2) mark as used, insert scan, update player score
+    # claim code + bump score on a single connection / transaction.
+    # The claim is a conditional UPDATE, so two players racing for the same code
+    # can't both win: the loser simply gets no row back.
     try:
-        # update codes
-        db_execute(
-            "UPDATE codes SET used_by_player_id = ?, used_at = ? WHERE id = ?",
-            (player_id, now, code_row.get("id")),
-            commit=True
-        )
+        with get_db_conn() as conn:
+            if USE_PG:
+                with conn.cursor() as cur:
+                    # one round-trip: the score CTE only fires when the claim returned a row
+                    cur.execute(
+                        """
+                        WITH c AS (
+                            UPDATE codes SET used_by_player_id = %s, used_at = %s
+                            WHERE code = %s AND used_by_player_id IS NULL
+                            RETURNING id
+                        ), p AS (
+                            UPDATE players SET score = score + 1
+                            WHERE id = %s AND EXISTS (SELECT 1 FROM c)
+                            RETURNING score
+                        )
+                        SELECT (SELECT id FROM c), (SELECT score FROM p);
+                        """,
+                        (player_id, now, scanned_code, player_id)
+                    )
+                    code_id, score = cur.fetchone()
+                conn.commit()
+            else:
+                code_id = _sqlite_claim_code(conn, player_id, scanned_code, now)
+                score = None
+                if code_id is not None:
+                    score = _sqlite_bump_score(conn, player_id)
+                conn.commit()
 
-        # insert scan
-        db_execute(
-            "INSERT INTO scans (player_id, code_id, scanned_at) VALUES (?, ?, ?)",
-            (player_id, code_row.get("id"), now),
-            commit=True
-        )
+            if code_id is None:
+                # claim matched nothing: either the code doesn't exist or it's already taken
+                if not db_execute("SELECT 1 FROM codes WHERE code = ?", (scanned_code,), fetchone=True, conn=conn):
+                    return jsonify({"status": "invalid", "message": "Invalid code"})
+                return jsonify({"status": "used", "message": "⛔ Already claimed!"})
+    except DB_ERROR:
+        # e.g. SQLite "database is locked" or a dropped Postgres connection
+        return jsonify({"status": "error", "message": "Server error (try again)"}), 500
 
-        # update player score
-        db_execute(
-            "UPDATE players SET score = score + 1 WHERE id = ?",
-            (player_id,),
-            commit=True
-        )
+    # audit row is written by the background scan log thread
+    log_scan(player_id, code_id, now)
+    # scores changed, don't serve a stale leaderboard
+    _leaderboard_cache.clear()
 
-        # fetch updated score
-        row = db_execute("SELECT score FROM players WHERE id = ?", (player_id,), fetchone=True)
-        score = row.get("score") if row else 0
-
-        return jsonify({"status": "ok", "message": "🎉 You captured this code!", "score": score})
-    except Exception as e:
-        # integrity/unique errors or race conditions might occur if two clients try same code at once
-        # re-check status
-        code_row2 = db_execute("SELECT * FROM codes WHERE code = ?", (scanned_code,), fetchone=True)
-        if code_row2 and code_row2.get("used_by_player_id"):
-            return jsonify({"status": "used", "message": "⛔ Already claimed!"})
-        # else generic error
-        return jsonify({"status": "error", "message": "Server error (try again)"}), 500
+    return jsonify({"status": "ok", "message": "🎉 You captured this code!", "score": score or 0})
 
 @app.route("/leaderboard")
 def leaderboard():
-    players = db_execute("SELECT name, score FROM players ORDER BY score DESC, name ASC", fetchall=True) or []
-    return render_template("leaderboard.html", players=players)
+    page = max(request.args.get("page", 1, type=int), 1)
+    if page > LEADERBOARD_MAX_PAGE:
+        abort(404)
+    offset = (page - 1) * LEADERBOARD_PAGE_SIZE
+
+    # every projector/phone refreshes this page, so serve it from memory for a
+    # couple of seconds instead of hitting the DB on each request
+    cached = _leaderboard_cache.get(page)
+    if cached and cached[0] > time.monotonic():
+        players = cached[1]
+    else:
+        # fetch one extra row to know whether there is a next page
+        players = db_execute(
+            "SELECT name, score FROM players ORDER BY score DESC, name ASC LIMIT ? OFFSET ?",
+            (LEADERBOARD_PAGE_SIZE + 1, offset),
+            fetchall=True
+        ) or []
+        if page <= LEADERBOARD_CACHE_PAGES:
+            now = time.monotonic()
+            # drop expired pages so they don't linger until the next scan clears the cache
+            for key, (expires_at, _) in list(_leaderboard_cache.items()):
+                if expires_at <= now:
+                    _leaderboard_cache.pop(key, None)
+            _leaderboard_cache[page] = (now + LEADERBOARD_CACHE_TTL, players)
+
+    has_next = len(players) > LEADERBOARD_PAGE_SIZE
+    return render_template(
+        "leaderboard.html",
+        players=players[:LEADERBOARD_PAGE_SIZE],
+        page=page,
+        offset=offset,
+        has_next=has_next,
+    )
 
 # Admin reset route
 @app.route("/admin/reset")
@@ -368,66 +679,51 @@ def admin_reset():
     # if request.args.get("secret") != os.environ.get("ADMIN_RESET_SECRET"):
     #     return "Missing or wrong secret", 403
 
+    # rows queued against the old data are useless now
+    _take_scan_log()
+
     # Delete tables / file depending on mode
     if USE_PG:
         try:
-            db_execute("DROP TABLE IF EXISTS scans;", commit=True)
-            db_execute("DROP TABLE IF EXISTS codes;", commit=True)
-            db_execute("DROP TABLE IF EXISTS players;", commit=True)
+            with get_db_conn() as conn:
+                db_execute("DROP TABLE IF EXISTS scans;", commit=True, conn=conn)
+                db_execute("DROP TABLE IF EXISTS codes;", commit=True, conn=conn)
+                db_execute("DROP TABLE IF EXISTS players;", commit=True, conn=conn)
         except Exception:
             pass
     else:
-        if os.path.exists(SQLITE_PATH):
-            try:
-                os.remove(SQLITE_PATH)
-            except Exception:
-                pass
+        # WAL mode keeps -wal / -shm files next to the DB
+        for path in (SQLITE_PATH, SQLITE_PATH + "-wal", SQLITE_PATH + "-shm"):
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except Exception:
+                    pass
 
     # Re-init DB and reload codes
     init_db()
+    _leaderboard_cache.clear()
     return "✔ Reset complete! All data cleared."
 
+@app.route("/admin/players")
+def admin_players():
+    # disabled unless ADMIN_PASS is set; then protected by ?pass=
+    expected = os.environ.get("ADMIN_PASS")
+    if not expected:
+        return "Disabled. Set ADMIN_PASS to enable this page.", 403
+
+    admin_pass = request.args.get("pass") or ""
+    # compare bytes: compare_digest rejects non-ASCII str
+    if not hmac.compare_digest(admin_pass.encode(), expected.encode()):
+        return "Unauthorized. Add ?pass=YOUR_PASSWORD", 403
+
+    # rows are rendered and sent while the cursor is still being read
+    rows = db_iter("SELECT id, name, score FROM players ORDER BY id")
+    return stream_template("admin_players.html", rows=rows)
+
 # Initialize DB on import/load
 with app.app_context():
     init_db()
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
-
-if __name__ == "__main__":
-	@app.route("/admin/players")
-	def admin_players():
-    		# OPTIONAL: protect the page with a simple password
-    		admin_pass = request.args.get("pass")
-    		expected = os.environ.get("ADMIN_PASS", "bechde123")
-
-    		if admin_pass != expected:
-        		return "Unauthorized. Add ?pass=YOUR_PASSWORD", 403
-
-    		rows = db_execute(
-        		"SELECT id, name, score FROM players ORDER BY id",
-        		fetchall=True
-    		) or []
-
-    		# Return a simple HTML table
-    		html = """
-    		<h2>Registered Players</h2>
-    		<table border='1' cellpadding='6' cellspacing='0' style='border-collapse: collapse;'>
-        		<tr>
-            		<th>ID</th>
-            		<th>Name</th>
-            		<th>Score</th>
-        		</tr>
-    		"""
-    		for r in rows:
-        		html += f"""
-        		<tr>
-            		<td>{r['id']}</td>
-            		<td>{r['name']}</td>
-            		<td>{r['score']}</td>
-        		</tr>
-        		"""
-
-    		html += "</table>"
-    		return html
-
@@ -16,13 +16,12 @@ logo = Image.open(LOGO_PATH).convert("RGBA")
 # Read codes
 df = pd.read_csv(CODES_CSV)      # expects a column named "code"
 
-for idx, code in enumerate(df["code"]):
-    if pd.isna(code):
-        continue
-    text = str(code).strip()
-    if not text:
-        continue
+# Clean codes and build file-safe names in one vectorized pass
+codes = df["code"].dropna().astype(str).str.strip()
+codes = codes[codes.str.len() > 0]
+safe_names = codes.str.replace(r"\W", "_", regex=True)
 
+for idx, text, safe in zip(codes.index, codes, safe_names):
     # Create QR (black & white, high error correction)
     qr = qrcode.QRCode(
         version=None,
@@ -46,7 +45,6 @@ for idx, code in enumerate(df["code"]):
 
     img_qr.paste(logo_resized, pos, mask=logo_resized)
 
-    safe = "".join(c if c.isalnum() else "_" for c in text)
     out_path = os.path.join(OUTPUT_FOLDER, f"QR_{safe or idx}.png")
     img_qr.save(out_path)
 